@@ -2,11 +2,20 @@ import os
 import sys
 import hashlib
 import json
+import sqlite3
 import time
 import fnmatch
+import itertools
+import re
+import heapq
+import functools
+import shutil
+import subprocess
+import threading
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from termcolor import colored
@@ -21,61 +30,263 @@ except ImportError:
     notify2 = None
     notify2_inited = False
 
-HASH_DB_DIR = Path.home() / ".heimdall"
-HASH_DB_DIR.mkdir(exist_ok=True)
+# Optional faster change-detection hashes, keyed by their --algorithm name
+EXTRA_HASHES = {}
+
+try:
+    import blake3
+    EXTRA_HASHES["blake3"] = blake3.blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+    EXTRA_HASHES.update({
+        "xxh3_64": xxhash.xxh3_64,
+        "xxh3_128": xxhash.xxh3_128,
+        "xxh64": xxhash.xxh64,
+    })
+except ImportError:
+    xxhash = None
+
+_notify_lock = threading.Lock()
+_pending_notifications = []
+
+# Fallback when notify2 is missing; runs detached so it never blocks a scan
+NOTIFY_SEND = shutil.which("notify-send") if notify2 is None else None
+
 IGNORE_FILE_NAME = ".heimdallignore"
+DEFAULT_ALGORITHM = "blake3" if blake3 is not None else "sha256"
+# Unchanged files sampled when inferring the algorithm of a database that never recorded it
+LEGACY_ALGORITHM_SAMPLES = 5
+DEFAULT_JOBS = (os.cpu_count() or 1) * 2
+DEFAULT_STAT_THREADS = 32
+STAT_BATCH_SIZE = 64
+SMALL_FILE_SIZE = 128 * 1024
+DEFAULT_MAX_REPORT_LINES = 200
+NOTIFY_DEBOUNCE_CYCLES = 3
 
 class FileInfo:
+    __slots__ = ("path", "hash", "mtime", "size")
+    
     def __init__(self, path, hash_val, mtime, size):
         self.path = path
         self.hash = hash_val
         self.mtime = mtime
         self.size = size
     
-    def to_dict(self):
-        return {"hash": self.hash, "mtime": self.mtime, "size": self.size}
-    
     @classmethod
     def from_dict(cls, path, data):
-        return cls(path, data["hash"], data["mtime"], data["size"])
+        # Legacy JSON databases stored hex digests
+        return cls(path, bytes.fromhex(data["hash"]), data["mtime"], data["size"])
 
-def get_hasher(alg):
+def _hash_small_file(filepath, new_hash):
+    # Bare open/read/close: skips the buffered reader's extra fstat/ioctl and the EOF read
+    h = new_hash()
+    fd = os.open(filepath, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        while chunk := os.read(fd, SMALL_FILE_SIZE):
+            h.update(chunk)
+            if len(chunk) < SMALL_FILE_SIZE:
+                break
+    finally:
+        os.close(fd)
+    return h.digest()
+
+def _fadvise(f, advice):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(f.fileno(), 0, 0, getattr(os, advice))
+    except OSError:
+        pass
+
+def _hash_stream(f, new_hash):
+    if hasattr(hashlib, "file_digest"):
+        # Python 3.11+: the read/update loop runs in C over a reused buffer
+        return hashlib.file_digest(f, new_hash)
+    
+    h = new_hash()
+    while chunk := f.read(65536):
+        h.update(chunk)
+    return h
+
+def algorithm_available(alg):
+    if alg in EXTRA_HASHES:
+        return True
     try:
         hashlib.new(alg)
     except ValueError:
+        return False
+    return True
+
+def resolve_algorithm(alg):
+    if not algorithm_available(alg):
         print(f"Invalid hash algorithm '{alg}'. Falling back to sha256.")
         alg = "sha256"
+    return alg
+
+def get_hasher(alg):
+    alg = resolve_algorithm(alg)
+    new_hash = EXTRA_HASHES.get(alg) or functools.partial(hashlib.new, alg)
     
-    def hash_func(filepath):
-        h = hashlib.new(alg)
+    def hash_func(filepath, size=None):
         try:
+            if size is not None and size < SMALL_FILE_SIZE:
+                return _hash_small_file(filepath, new_hash)
+            
             with open(filepath, "rb") as f:
-                while chunk := f.read(65536):
-                    h.update(chunk)
-            return h.hexdigest()
+                # Read-once data: ask for aggressive readahead, then drop the pages afterwards
+                # so a full scan does not evict the rest of the page cache
+                _fadvise(f, "POSIX_FADV_SEQUENTIAL")
+                h = _hash_stream(f, new_hash)
+                _fadvise(f, "POSIX_FADV_DONTNEED")
+            return h.digest()
         except (IOError, OSError) as e:
             print(f"Error hashing {filepath}: {e}")
             return None
     return hash_func
 
+def _connect_db(db_path):
+    conn = sqlite3.connect(db_path)
+    # Paths are stored as raw bytes so undecodable filenames round-trip
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files (path BLOB PRIMARY KEY, hash BLOB, mtime REAL, size INTEGER)"
+    )
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    return conn
+
+def _migrate_json_db(json_path, db_path):
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        file_infos = {path: FileInfo.from_dict(path, info) for path, info in data.items()}
+    except (json.JSONDecodeError, KeyError, ValueError) as e:
+        print(f"Error loading hash database: {e}")
+        return {}
+    
+    if save_hash_db(db_path, file_infos):
+        json_path.unlink()
+    return file_infos
+
 def load_hash_db(db_path):
     if not db_path.exists():
+        json_path = db_path.with_suffix(".json")
+        if json_path.exists():
+            return _migrate_json_db(json_path, db_path)
         return {}
+    
     try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return {path: FileInfo.from_dict(path, info) for path, info in data.items()}
-    except (json.JSONDecodeError, KeyError) as e:
+        conn = _connect_db(db_path)
+        try:
+            rows = conn.execute("SELECT path, hash, mtime, size FROM files").fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
         print(f"Error loading hash database: {e}")
         return {}
+    
+    file_infos = {}
+    for path, hash_val, mtime, size in rows:
+        path = os.fsdecode(path)
+        file_infos[path] = FileInfo(path, hash_val, mtime, size)
+    return file_infos
 
-def save_hash_db(db_path, file_infos):
-    data = {path: info.to_dict() for path, info in file_infos.items()}
+def load_db_algorithm(db_path):
+    if not db_path.exists():
+        return None
     try:
-        with open(db_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except IOError as e:
+        conn = _connect_db(db_path)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'algorithm'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"Error loading hash database: {e}")
+        return None
+    return row[0] if row else None
+
+def save_db_algorithm(db_path, algorithm):
+    return _write_hash_db(db_path, [], algorithm=algorithm)
+
+def _legacy_candidates(digest_size):
+    candidates = []
+    for alg in sorted(hashlib.algorithms_available):
+        try:
+            h = hashlib.new(alg)
+        except ValueError:
+            continue
+        if not alg.startswith("shake_") and h.digest_size == digest_size:
+            candidates.append(alg)
+    return candidates
+
+def infer_legacy_algorithm(file_infos, candidates=None):
+    # Older databases did not record the algorithm and -a accepted any hashlib name, so find
+    # the candidate whose digest of a still-unchanged file reproduces the stored one
+    if candidates is None:
+        candidates = _legacy_candidates(len(next(iter(file_infos.values())).hash))
+    
+    sampled = 0
+    for info in file_infos.values():
+        try:
+            stat = os.stat(info.path)
+        except OSError:
+            continue
+        if stat.st_mtime != info.mtime or stat.st_size != info.size:
+            continue
+        
+        for alg in candidates:
+            if get_hasher(alg)(info.path, stat.st_size) == info.hash:
+                return alg
+        
+        sampled += 1
+        if sampled >= LEGACY_ALGORITHM_SAMPLES:
+            break
+    return None
+
+def _db_row(path, info):
+    return os.fsencode(path), info.hash, info.mtime, info.size
+
+def _write_hash_db(db_path, upserts, deleted_paths=(), clear=False, algorithm=None):
+    try:
+        conn = _connect_db(db_path)
+        try:
+            with conn:
+                if clear:
+                    conn.execute("DELETE FROM files")
+                if algorithm:
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('algorithm', ?)", (algorithm,))
+                conn.executemany(
+                    "DELETE FROM files WHERE path = ?", [(os.fsencode(path),) for path in deleted_paths]
+                )
+                conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", upserts)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
         print(f"Error saving hash database: {e}")
+        return False
+    return True
+
+def save_hash_db(db_path, file_infos, algorithm=None):
+    rows = [_db_row(path, info) for path, info in file_infos.items()]
+    return _write_hash_db(db_path, rows, clear=True, algorithm=algorithm)
+
+def update_hash_db(db_path, old_infos, new_infos):
+    # Only rows that differ from the previous scan are written, so the cost scales with changes
+    deleted_paths = old_infos.keys() - new_infos.keys()
+    upserts = []
+    
+    for path, info in new_infos.items():
+        old_info = old_infos.get(path)
+        if old_info is info:
+            continue
+        if (old_info is None or old_info.hash != info.hash or
+                old_info.mtime != info.mtime or old_info.size != info.size):
+            upserts.append(_db_row(path, info))
+    
+    if not deleted_paths and not upserts:
+        return True
+    return _write_hash_db(db_path, upserts, deleted_paths)
 
 def load_ignore_patterns(folder):
     ignore_path = Path(folder) / IGNORE_FILE_NAME
@@ -90,52 +301,139 @@ def load_ignore_patterns(folder):
         print(f"Error loading ignore file: {e}")
         return []
 
-def should_ignore(path, ignore_patterns):
-    path_str = str(path)
-    basename = os.path.basename(path_str)
+def compile_ignore_patterns(ignore_patterns):
+    if not ignore_patterns:
+        return None
+    
+    # One alternation instead of a per-pattern fnmatch loop; normcase mirrors fnmatch.fnmatch
+    regexes = [fnmatch.translate(os.path.normcase(pattern)) for pattern in ignore_patterns]
+    return re.compile("|".join(f"(?:{regex})" for regex in regexes))
+
+def should_ignore(path, ignore_re):
+    if ignore_re is None:
+        return False
     
-    for pattern in ignore_patterns:
-        if fnmatch.fnmatch(path_str, pattern) or fnmatch.fnmatch(basename, pattern):
-            return True
-    return False
+    path_str = os.path.normcase(str(path))
+    if ignore_re.match(path_str):
+        return True
+    return ignore_re.match(os.path.basename(path_str)) is not None
 
-def scan_folder(folder, ignore_patterns, hash_func, verbose=False):
+def _walk_files(folder):
+    # Single-pass replacement for os.walk: DirEntry.is_dir() answers from the
+    # d_type already returned by readdir, so no extra stat is needed to classify.
+    # Like os.walk, symlinked directories are neither descended into nor reported.
+    pending = deque([os.fspath(folder)])
+    
+    while pending:
+        root = pending.popleft()
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    
+                    if not is_dir:
+                        yield entry.path
+                    elif not entry.is_symlink():
+                        pending.append(entry.path)
+        except OSError:
+            continue
+
+def _stat_batch(paths):
+    results = []
+    for path in paths:
+        try:
+            results.append((path, os.stat(path), None))
+        except (OSError, IOError) as e:
+            results.append((path, None, e))
+    return results
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _parallel_stat(paths, workers=DEFAULT_STAT_THREADS, verbose=False):
+    stats = {}
+    
+    # os.stat releases the GIL, so per-call latency overlaps across threads.
+    # Paths go out in batches so pool bookkeeping is paid per batch, not per file.
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for results in executor.map(_stat_batch, _batched(paths, STAT_BATCH_SIZE)):
+            for path, stat, error in results:
+                if error is not None:
+                    if verbose:
+                        print(f"Error processing {path}: {error}")
+                    continue
+                stats[path] = stat
+    
+    return stats
+
+def _iter_candidates(folder, ignore_re, verbose=False):
+    for path in _walk_files(folder):
+        if should_ignore(path, ignore_re):
+            if verbose:
+                print(f"Ignored: {path}")
+            continue
+        
+        yield path
+
+def scan_folder(folder, ignore_patterns, hash_func, verbose=False, jobs=DEFAULT_JOBS,
+                old_file_infos=None, stat_threads=DEFAULT_STAT_THREADS):
+    if old_file_infos is None:
+        old_file_infos = {}
+    
     file_infos = {}
-    total_files = 0
     processed_files = 0
+    ignore_re = compile_ignore_patterns(ignore_patterns)
     
-    for root, _, files in os.walk(folder):
-        total_files += len(files)
+    # The walk streams straight into the stat pool, so stats start while directories are still being read
+    stats = _parallel_stat(_iter_candidates(folder, ignore_re, verbose), stat_threads, verbose)
+    total_files = len(stats)
+    to_hash = []
     
-    for root, _, files in os.walk(folder):
-        for file in files:
-            path = os.path.join(root, file)
-            
-            if should_ignore(path, ignore_patterns):
-                if verbose:
-                    print(f"Ignored: {path}")
-                continue
+    for path, stat in stats.items():
+        old_info = old_file_infos.get(path)
+        
+        # Same shortcut as rsync/git: unchanged mtime and size means unchanged content
+        if old_info and old_info.mtime == stat.st_mtime and old_info.size == stat.st_size:
+            # Identical on every field, so the old object is reused and later stages can compare by identity
+            file_infos[path] = old_info
+            processed_files += 1
             
-            try:
-                stat = os.stat(path)
-                hash_val = hash_func(path)
+            if verbose:
+                print(f"[{processed_files}/{total_files}] Unchanged: {path}")
+        else:
+            to_hash.append(path)
+    
+    # Largest files first so one big file queued last does not leave the pool idle behind it
+    to_hash.sort(key=lambda path: stats[path].st_size, reverse=True)
+    sizes = [stats[path].st_size for path in to_hash]
+    
+    # hashlib releases the GIL while digesting, so threads overlap both I/O and hashing
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for path, hash_val in zip(to_hash, executor.map(hash_func, to_hash, sizes)):
+            if hash_val:
+                stat = stats[path]
+                file_infos[path] = FileInfo(path, hash_val, stat.st_mtime, stat.st_size)
+                processed_files += 1
                 
-                if hash_val:
-                    file_info = FileInfo(path, hash_val, stat.st_mtime, stat.st_size)
-                    file_infos[path] = file_info
-                    processed_files += 1
-                    
-                    if verbose:
-                        print(f"[{processed_files}/{total_files}] Hashed: {path}")
-                        
-            except (OSError, IOError) as e:
                 if verbose:
-                    print(f"Error processing {path}: {e}")
-                continue
+                    print(f"[{processed_files}/{total_files}] Hashed: {path}")
     
     return file_infos
 
 def detect_moves(added_files, deleted_files, old_infos, new_infos):
+    if not added_files or not deleted_files:
+        return [], list(added_files), list(deleted_files)
+    
     moves = []
     hash_to_deleted = defaultdict(list)
     hash_to_added = defaultdict(list)
@@ -145,27 +443,26 @@ def detect_moves(added_files, deleted_files, old_infos, new_infos):
             file_hash = old_infos[deleted_path].hash
             hash_to_deleted[file_hash].append(deleted_path)
     
+    # Only added files sharing a digest with a deleted file can be moves, so index just those
     for added_path in added_files:
         if added_path in new_infos:
             file_hash = new_infos[added_path].hash
-            hash_to_added[file_hash].append(added_path)
+            if file_hash in hash_to_deleted:
+                hash_to_added[file_hash].append(added_path)
     
-    for file_hash in hash_to_deleted:
-        if file_hash in hash_to_added:
-            deleted_paths = hash_to_deleted[file_hash]
-            added_paths = hash_to_added[file_hash]
-            
-            min_pairs = min(len(deleted_paths), len(added_paths))
+    if not hash_to_added:
+        return moves, list(added_files), list(deleted_files)
+    
+    for file_hash, added_paths in hash_to_added.items():
+        deleted_paths = hash_to_deleted[file_hash]
+        
+        for old_path, new_path in zip(deleted_paths, added_paths):
+            old_info = old_infos[old_path]
+            new_info = new_infos[new_path]
             
-            for i in range(min_pairs):
-                old_path = deleted_paths[i]
-                new_path = added_paths[i]
-                old_info = old_infos[old_path]
-                new_info = new_infos[new_path]
-                
-                if (old_info.size == new_info.size and 
-                    abs(old_info.mtime - new_info.mtime) < 2):
-                    moves.append((old_path, new_path))
+            if (old_info.size == new_info.size and 
+                abs(old_info.mtime - new_info.mtime) < 2):
+                moves.append((old_path, new_path))
     
     actual_added = []
     actual_deleted = []
@@ -183,15 +480,17 @@ def detect_moves(added_files, deleted_files, old_infos, new_infos):
     return moves, actual_added, actual_deleted
 
 def compare_hashes(old_infos, new_infos):
-    old_files = set(old_infos.keys())
-    new_files = set(new_infos.keys())
-    
-    added_files = list(new_files - old_files)
-    deleted_files = list(old_files - new_files)
+    # Set operations straight on the key views; no full copies of either key set
+    added_files = list(new_infos.keys() - old_infos.keys())
+    deleted_files = list(old_infos.keys() - new_infos.keys())
     modified_files = []
     
-    for path in new_files & old_files:
-        if new_infos[path].hash != old_infos[path].hash:
+    for path, new_info in new_infos.items():
+        old_info = old_infos.get(path)
+        if old_info is None or old_info is new_info:
+            continue
+        # A size change is conclusive on its own; only same-size files need the digest compare
+        if new_info.size != old_info.size or new_info.hash != old_info.hash:
             modified_files.append(path)
     
     moves, actual_added, actual_deleted = detect_moves(
@@ -219,7 +518,13 @@ def format_size(size_bytes):
         return f"{int(size)}B"
     return f"{size:.1f}{units[unit_index]}"
 
-def print_report(added, deleted, modified, moves, file_infos, show_size=False):
+def _report_entries(items, max_lines):
+    # nsmallest is O(n log k), so huge change sets are not fully sorted just to print a few lines
+    if max_lines and len(items) > max_lines:
+        return heapq.nsmallest(max_lines, items), len(items) - max_lines
+    return sorted(items), 0
+
+def format_report(added, deleted, modified, moves, file_infos, show_size=False, max_lines=0):
     lines = []
     total_changes = len(added) + len(deleted) + len(modified) + len(moves)
     
@@ -228,59 +533,119 @@ def print_report(added, deleted, modified, moves, file_infos, show_size=False):
     else:
         if moves:
             lines.append(colored(f"\n🔄 Moved files ({len(moves)}):", "blue"))
-            for old_path, new_path in sorted(moves):
+            entries, remaining = _report_entries(moves, max_lines)
+            for old_path, new_path in entries:
                 if show_size and new_path in file_infos:
                     size_str = f" [{format_size(file_infos[new_path].size)}]"
                 else:
                     size_str = ""
                 lines.append(f"  {old_path} → {new_path}{size_str}")
+            if remaining:
+                lines.append(f"  ... and {remaining} more")
         
         if added:
             lines.append(colored(f"\n🟢 Added files ({len(added)}):", "green"))
-            for path in sorted(added):
+            entries, remaining = _report_entries(added, max_lines)
+            for path in entries:
                 if show_size and path in file_infos:
                     size_str = f" [{format_size(file_infos[path].size)}]"
                 else:
                     size_str = ""
                 mtime_str = format_time(file_infos[path].mtime)
                 lines.append(f"  + {path}{size_str} (mtime: {mtime_str})")
+            if remaining:
+                lines.append(f"  ... and {remaining} more")
         
         if deleted:
             lines.append(colored(f"\n🔴 Deleted files ({len(deleted)}):", "red"))
-            for path in sorted(deleted):
+            entries, remaining = _report_entries(deleted, max_lines)
+            for path in entries:
                 lines.append(f"  - {path}")
+            if remaining:
+                lines.append(f"  ... and {remaining} more")
         
         if modified:
             lines.append(colored(f"\n🟠 Modified files ({len(modified)}):", "yellow"))
-            for path in sorted(modified):
+            entries, remaining = _report_entries(modified, max_lines)
+            for path in entries:
                 if show_size and path in file_infos:
                     size_str = f" [{format_size(file_infos[path].size)}]"
                 else:
                     size_str = ""
                 mtime_str = format_time(file_infos[path].mtime)
                 lines.append(f"  * {path}{size_str} (mtime: {mtime_str})")
+            if remaining:
+                lines.append(f"  ... and {remaining} more")
     
-    output = "\n".join(lines)
+    return "\n".join(lines)
+
+def print_report(added, deleted, modified, moves, file_infos, show_size=False,
+                 max_lines=DEFAULT_MAX_REPORT_LINES):
+    output = format_report(added, deleted, modified, moves, file_infos, show_size, max_lines)
     print(output)
     return output
 
-def send_notification(title, message):
+def init_notifications():
+    # Connect to the notification daemon up front so the first alert doesn't pay for it;
+    # send_notification retries lazily if this fails
     global notify2_inited
-    if notify2 is None:
+    if notify2 is None or notify2_inited:
         return
     
     try:
-        if not notify2_inited:
-            notify2.init("Heimdall")
-            notify2_inited = True
-        
-        notification = notify2.Notification(title, message)
-        notification.show()
-    except Exception as e:
-        print(f"Notification error: {e}")
+        notify2.init("Heimdall")
+        notify2_inited = True
+    except Exception:
+        pass
+
+def _show_notification(title, message):
+    global notify2_inited
+    with _notify_lock:
+        try:
+            if not notify2_inited:
+                notify2.init("Heimdall")
+                notify2_inited = True
+            
+            notification = notify2.Notification(title, message)
+            notification.show()
+        except Exception as e:
+            print(f"Notification error: {e}")
+
+def send_notification(title, message):
+    if notify2 is None:
+        if NOTIFY_SEND is not None:
+            try:
+                subprocess.Popen(
+                    [NOTIFY_SEND, "--app-name=Heimdall", title, message],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            except OSError as e:
+                print(f"Notification error: {e}")
+        return
+    
+    # notify2 talks to D-Bus synchronously; keep that off the scan loop
+    thread = threading.Thread(target=_show_notification, args=(title, message), daemon=True)
+    thread.start()
+    _pending_notifications[:] = [t for t in _pending_notifications if t.is_alive()] + [thread]
+
+def wait_for_notifications(timeout=5):
+    # Called before exiting so a one-shot run's alert is not cut off with the process
+    deadline = time.monotonic() + timeout
+    for thread in _pending_notifications:
+        thread.join(max(0, deadline - time.monotonic()))
+
+@functools.lru_cache(maxsize=None)
+def get_hash_db_dir():
+    db_dir = Path.home() / ".heimdall"
+    db_dir.mkdir(exist_ok=True)
+    return db_dir
 
 def get_folder_hash(folder_path):
-    return hashlib.sha256(str(Path(folder_path).resolve()).encode()).hexdigest()[:12]
+    # Expects an already-resolved path; the digest names existing databases, so it stays sha256
+    return hashlib.sha256(str(folder_path).encode()).hexdigest()[:12]
+
+def get_db_path(folder_path):
+    return get_hash_db_dir() / f"heimdall_{get_folder_hash(folder_path)}.db"
 
 def main():
     import argparse
@@ -296,11 +661,20 @@ def main():
     parser.add_argument("-r", "--reset", action="store_true", help="Reset hash database")
     parser.add_argument("-v", "--verbose", action="store_true", help="Verbose output")
     parser.add_argument("-o", "--output", help="Append reports to file")
-    parser.add_argument("-a", "--algorithm", default="sha256", help="Hash algorithm (default: sha256)")
+    parser.add_argument("-a", "--algorithm",
+                        help=f"Hash algorithm for new baselines (default: {DEFAULT_ALGORITHM}); "
+                             "existing databases keep the algorithm they were built with")
+    parser.add_argument("-j", "--jobs", type=int, default=DEFAULT_JOBS, help=f"Parallel hashing threads (default: {DEFAULT_JOBS})")
+    parser.add_argument("--stat-threads", type=int, default=DEFAULT_STAT_THREADS, help=f"Parallel stat threads (default: {DEFAULT_STAT_THREADS})")
     parser.add_argument("-s", "--show-size", action="store_true", help="Show file sizes")
+    parser.add_argument("--max-report-lines", type=int, default=DEFAULT_MAX_REPORT_LINES,
+                        help=f"Maximum entries listed per change category, 0 for no limit (default: {DEFAULT_MAX_REPORT_LINES})")
+    parser.add_argument("-c", "--checksum", action="store_true", help="Rehash every file instead of trusting unchanged mtime and size")
     parser.add_argument("--no-notifications", action="store_true", help="Disable desktop notifications")
     
     args = parser.parse_args()
+    if args.max_report_lines < 0:
+        parser.error("--max-report-lines must be 0 or greater")
 
     if args.reset:
         if args.folder:
@@ -308,15 +682,17 @@ def main():
             if not folder_path.is_dir():
                 print(f"Error: '{folder_path}' is not a directory.")
                 return 1
-            folder_hash = get_folder_hash(folder_path)
-            db_path = HASH_DB_DIR / f"heimdall_{folder_hash}.json"
-            if db_path.exists():
-                db_path.unlink()
+            db_path = get_db_path(folder_path)
+            db_files = [path for path in (db_path, db_path.with_suffix(".json")) if path.exists()]
+            if db_files:
+                for db_file in db_files:
+                    db_file.unlink()
                 print(colored(f"✅ Hash database reset for '{folder_path}'.", "cyan"))
             else:
                 print(colored(f"ℹ️ No hash database found for '{folder_path}'.", "yellow"))
         else:
-            db_files = list(HASH_DB_DIR.glob("heimdall_*.json"))
+            db_dir = get_hash_db_dir()
+            db_files = list(db_dir.glob("heimdall_*.db")) + list(db_dir.glob("heimdall_*.json"))
             if db_files:
                 for db_file in db_files:
                     db_file.unlink()
@@ -337,52 +713,109 @@ def main():
 
     # FIXED: Load ignore patterns here, after folder_path is defined
     ignore_patterns = load_ignore_patterns(folder_path)
-    hash_func = get_hasher(args.algorithm)
     
-    folder_hash = get_folder_hash(folder_path)
-    db_path = HASH_DB_DIR / f"heimdall_{folder_hash}.json"
+    db_path = get_db_path(folder_path)
+    old_file_infos = load_hash_db(db_path)
+    
+    # Digests are only comparable within one algorithm, so an existing database keeps its own
+    if old_file_infos:
+        algorithm = load_db_algorithm(db_path)
+        if algorithm is None:
+            # Written before the algorithm was recorded: verify an explicit -a against the
+            # stored digests, otherwise infer it from them
+            if args.algorithm:
+                if not algorithm_available(args.algorithm):
+                    print(f"Error: algorithm {args.algorithm} is not available. "
+                          "Install it or use --reset to rebuild.")
+                    return 1
+                algorithm = infer_legacy_algorithm(old_file_infos, [args.algorithm])
+                if algorithm is None:
+                    print(f"Error: the database digests do not match {args.algorithm}. "
+                          "Omit -a to detect the algorithm, or use --reset to rebuild.")
+                    return 1
+            else:
+                algorithm = infer_legacy_algorithm(old_file_infos)
+                if algorithm is None:
+                    print("Error: cannot determine which algorithm built this database. "
+                          "Rerun with -a ALGORITHM or use --reset to rebuild.")
+                    return 1
+            save_db_algorithm(db_path, algorithm)
+        if not algorithm_available(algorithm):
+            print(f"Error: database was built with {algorithm}, which is not available. "
+                  "Install it or use --reset to rebuild.")
+            return 1
+        if args.algorithm and resolve_algorithm(args.algorithm) != algorithm:
+            print(colored(f"⚠️ Database was built with {algorithm}; keeping it. Use --reset to switch algorithms.", "yellow"))
+    else:
+        algorithm = resolve_algorithm(args.algorithm or DEFAULT_ALGORITHM)
+    hash_func = get_hasher(algorithm)
 
     print(f"📁 Monitoring: {folder_path}")
     if ignore_patterns:
         print(f"🚫 Ignoring: {', '.join(ignore_patterns)}")
     print(f"💾 Database: {db_path}")
-    print(f"🔐 Algorithm: {args.algorithm}")
+    print(f"🔐 Algorithm: {algorithm}")
     
     if args.watch:
         print(f"⏱️ Interval: {args.interval}s")
         print("Press Ctrl+C to stop.\n")
 
-    old_file_infos = load_hash_db(db_path)
-
     if not old_file_infos:
         print("Creating baseline...")
-        new_file_infos = scan_folder(folder_path, ignore_patterns, hash_func, verbose=args.verbose)
-        save_hash_db(db_path, new_file_infos)
+        new_file_infos = scan_folder(
+            folder_path, ignore_patterns, hash_func, verbose=args.verbose, jobs=args.jobs,
+            stat_threads=args.stat_threads
+        )
+        save_hash_db(db_path, new_file_infos, algorithm=algorithm)
         print(colored(f"✅ Baseline created with {len(new_file_infos)} files.", "cyan"))
         return 0
 
+    if not args.no_notifications:
+        init_notifications()
+
+    cycle = 0
+    last_notified = (None, 0)
+
     def check_changes():
-        nonlocal old_file_infos
+        nonlocal old_file_infos, cycle, last_notified
+        cycle += 1
         
         if args.verbose:
             print(f"Scanning {folder_path}...")
         
-        new_file_infos = scan_folder(folder_path, ignore_patterns, hash_func, verbose=args.verbose)
+        new_file_infos = scan_folder(
+            folder_path, ignore_patterns, hash_func, verbose=args.verbose, jobs=args.jobs,
+            old_file_infos=None if args.checksum else old_file_infos, stat_threads=args.stat_threads
+        )
         added, deleted, modified, moves = compare_hashes(old_file_infos, new_file_infos)
 
         total_changes = len(added) + len(deleted) + len(modified) + len(moves)
         
         if total_changes > 0:
-            report = print_report(added, deleted, modified, moves, new_file_infos, show_size=args.show_size)
+            report = print_report(
+                added, deleted, modified, moves, new_file_infos,
+                show_size=args.show_size, max_lines=args.max_report_lines
+            )
             change_summary = f"Changes: +{len(added)} -{len(deleted)} *{len(modified)} ↔{len(moves)}"
             
             if not args.no_notifications:
-                send_notification("heimdall alert", change_summary)
+                # A file still being written shows up as the same change in consecutive cycles;
+                # alert once for it, but always alert when a different set of paths changes
+                changed_paths = frozenset(itertools.chain(added, deleted, modified, moves))
+                last_paths, last_cycle = last_notified
+                if changed_paths != last_paths or cycle - last_cycle > NOTIFY_DEBOUNCE_CYCLES:
+                    send_notification("heimdall alert", change_summary)
+                    last_notified = (changed_paths, cycle)
             
+            update_hash_db(db_path, old_file_infos, new_file_infos)
             old_file_infos = new_file_infos
-            save_hash_db(db_path, new_file_infos)
             
             if args.output:
+                # The log is the persistent record, so it always gets every entry
+                if args.max_report_lines:
+                    report = format_report(
+                        added, deleted, modified, moves, new_file_infos, show_size=args.show_size
+                    )
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 try:
                     with open(args.output, "a", encoding="utf-8") as f:
@@ -395,6 +828,9 @@ def main():
             
             print(colored(f"\n💾 Database updated at {datetime.now().strftime('%H:%M:%S')}", "cyan"))
         else:
+            # Keep refreshed mtimes of touched-but-identical files so the next pass can skip them
+            update_hash_db(db_path, old_file_infos, new_file_infos)
+            old_file_infos = new_file_infos
             if args.watch:
                 timestamp = datetime.now().strftime('%H:%M:%S')
                 print(f"\r✅ No changes detected at {timestamp}", end="", flush=True)
@@ -413,6 +849,7 @@ def main():
             return 0
     else:
         check_changes()
+        wait_for_notifications()
         return 0
 
 if __name__ == "__main__":